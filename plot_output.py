@@ -14,86 +14,117 @@
 #
 import sys
 import re
+import matplotlib
+matplotlib.use('Agg')  # only ever writes files, so skip probing for a GUI backend
 import matplotlib.pyplot as plt
-
-import re
-from dataclasses import dataclass, astuple
-
-
-@dataclass
-class Point:
-    pq: int
-    recall: float
-    throughput: float
-    M: int
-    ef: int
-    overquery: int
-
-def parse_data(description, data):
+import numpy as np
+from matplotlib.lines import Line2D
+
+plt.rcParams['path.simplify'] = True
+plt.rcParams['agg.path.chunksize'] = 10000
+
+# one alternative per kind of line we care about; the outer group names the kind
+LOG_RE = re.compile('|'.join(f'^(?P<{kind}>{pattern})' for kind, pattern in (
+    ('description', r'(?P<name>\S+): (?P<base_count>\d+) base and (?P<query_count>\d+) query vectors \w+, dimensions (?P<dimensions>\d+)'),
+    ('pq', r'ProductQuantization\((?P<pq_subspaces>\d+)\)'),
+    ('bq', r'BinaryQuantization'),
+    ('uncompressed', r'Uncompressed'),
+    ('build', r'Build M=(?P<M>\d+) ef=(?P<ef>\d+)'),
+    # in-memory (on-heap) graph + vectors are benched as a sanity check;
+    # "Query (memory)" lines are deliberately not matched so they stay out of the disk-based plot
+    ('query', r'  Query (?:\(disk\) )?top 100/(?P<overquery>\d+) recall (?P<recall>\d+\.\d+) in (?P<query_time>\d+\.\d+)s'),
+)), re.M)
+
+# columns of the parsed data, stored as parallel arrays
+POINT_FIELDS = ('pq', 'recall', 'throughput', 'M', 'ef', 'overquery')
+
+def parse_file(path):
     """
-    Parses a given set of data lines to extract relevant information.
+    Parses a benchmark log, scanning the whole text with LOG_RE.
 
     Parameters:
-    - description (str): Metadata description of the dataset.
-    - data (list of str): List of data lines to parse.
+    - path (str): Path to the benchmark output file.
 
     Returns:
-    - dict: A dictionary containing parsed information.
+    - list of dict: One dictionary of parsed information per dataset; 'data' maps
+      each of POINT_FIELDS to a numpy array with one entry per query run.
     """
-    base_vector_count = int(re.search(r'(\d+) base', description).group(1))
-    query_vector_count = int(re.search(r'(\d+) query', description).group(1))
-    dimensions = int(re.search(r'dimensions (\d+)', description).group(1))
-    dataset_name = re.search(r'(\S+):', description).group(1)
-
-    parsed_data = []
-    current_pq = None
-    M = None
-    for line in data:
-        if "ProductQuantization" in line:
-            current_pq = 'PQ@' + re.search(r'\((\d+)\)', line).group(1)
-        elif "BinaryQuantization" in line:
+    with open(path, 'r') as file:
+        text = file.read()
+
+    datasets = []
+    for m in LOG_RE.finditer(text):
+        kind = m.lastgroup
+        if kind == 'description':
+            query_vector_count = int(m['query_count'])
+            parsed_data = {field: [] for field in POINT_FIELDS}
+            current_pq = None
+            M = None
+            datasets.append({
+                'name': m['name'],
+                'base_vector_count': int(m['base_count']),
+                'dimensions': int(m['dimensions']),
+                'data': parsed_data
+            })
+        elif not datasets:
+            continue
+        elif kind == 'pq':
+            current_pq = 'PQ@' + m['pq_subspaces']
+        elif kind == 'bq':
             current_pq = 'BQ'
-        elif "Uncompressed" in line:
+        elif kind == 'uncompressed':
             current_pq = 'UC'
-        elif "Build M=" in line:
-            M = int(re.search(r'M=(\d+)', line).group(1))
-            ef = int(re.search(r'ef=(\d+)', line).group(1))
-        elif "  Query " in line:
-            if "(memory)" in line:
-                # in-memory (on-heap) graph + vectors are benched as a sanity check;
-                # we shouldn't include them in the plot of disk-based performance
-                continue
-            recall = float(re.search(r'recall (\d+\.\d+)', line).group(1))
-            query_time = float(re.search(r'in (\d+\.\d+)s', line).group(1))
-            overquery = int(re.search(r'top 100/(\d+) ', line).group(1))
+        elif kind == 'build':
+            M = int(m['M'])
+            ef = int(m['ef'])
+        else:
+            recall = float(m['recall'])
+            query_time = float(m['query_time'])
+            overquery = int(m['overquery'])
 
             throughput = query_vector_count * 10 / query_time
 
             assert current_pq is not None
             assert M is not None
-            parsed_data.append(Point(current_pq, recall, throughput, M, ef, overquery))
-
-    return {
-        'name': dataset_name,
-        'base_vector_count': base_vector_count,
-        'dimensions': dimensions,
-        'data': parsed_data
-    }
-
-
-def is_pareto_optimal(candidate, others):
-    """Determine if a candidate point is Pareto-optimal."""
-    for point in others:
-        # Check if another point has higher or equal recall and throughput
-        if point.recall >= candidate.recall and point.throughput > candidate.throughput:
-            return False
-        if point.recall > candidate.recall and point.throughput >= candidate.throughput:
-            return False
-    return True
+            for field, value in zip(POINT_FIELDS, (current_pq, recall, throughput, M, ef, overquery)):
+                parsed_data[field].append(value)
+
+    for dataset in datasets:
+        dataset['data'] = {field: np.array(values) for field, values in dataset['data'].items()}
+    return datasets
 
 def filter_pareto_optimal(data):
-    """Filter out only the Pareto-optimal points."""
-    return [point for point in data if is_pareto_optimal(point, data)]
+    """
+    Filter out only the Pareto-optimal points.
+
+    Points are visited in order of decreasing recall (ties broken by decreasing
+    throughput); a point is optimal iff its throughput beats every point already
+    visited, or it is an exact duplicate of the last optimal point.
+    The surviving points are returned in their original order.
+    """
+    order = np.lexsort((-data['throughput'], -data['recall']))
+    recall = data['recall'][order]
+    throughput = data['throughput'][order]
+    n = len(order)
+
+    # best throughput among the points visited before each one
+    best_before = np.empty(n)
+    best_before[:1] = -np.inf
+    best_before[1:] = np.maximum.accumulate(throughput[:-1])
+    optimal = throughput > best_before
+
+    # an exact duplicate follows its twin in sort order and shares its fate
+    duplicate = np.zeros(n, dtype=bool)
+    duplicate[1:] = (recall[1:] == recall[:-1]) & (throughput[1:] == throughput[:-1])
+    first_of_run = np.maximum.accumulate(np.where(duplicate, 0, np.arange(n)))
+    optimal = optimal[first_of_run]
+
+    mask = np.zeros(n, dtype=bool)
+    mask[order] = optimal
+    return {field: values[mask] for field, values in data.items()}
+
+# a single figure is reused for every dataset, cleared between plots
+fig, ax = plt.subplots(figsize=(15, 20))
 
 def plot_dataset(dataset, output_dir="."):
     # Extract dataset info
@@ -102,38 +133,31 @@ def plot_dataset(dataset, output_dir="."):
     dimensions = dataset['dimensions']
     data = dataset['data']
     
-    # Create plot
-    plt.figure(figsize=(15, 20))
-    for pq, recall, throughput, M, ef, overquery in (astuple(p) for p in data):
-        plt.scatter(recall, throughput, label=f'Q={pq}, M={M}, ef={ef}, oq={overquery}')
-        plt.annotate(f'Q={pq}, M={M}, ef={ef}, oq={overquery}', (recall, throughput))
+    # Create plot, one color per quantization
+    ax.cla()
+    cmap = plt.get_cmap('tab10')
+    quantizations, codes = np.unique(data['pq'], return_inverse=True)
+    ax.scatter(data['recall'], data['throughput'], c=cmap(codes % cmap.N))
+    for pq, recall, throughput, M, ef, overquery in zip(*(data[field] for field in POINT_FIELDS)):
+        ax.annotate(f'Q={pq}, M={M}, ef={ef}, oq={overquery}', (recall, throughput))
+    legend_handles = [Line2D([], [], marker='o', linestyle='', color=cmap(i % cmap.N), label=f'Q={pq}')
+                      for i, pq in enumerate(quantizations)]
     
     # Set title and labels
-    plt.title(f"Dataset: {name}\\nBase Vector Count: {base_vector_count}\\nDimensions: {dimensions}")
-    plt.xlabel('Recall')
-    plt.ylabel('Throughput')
-    plt.legend(loc='upper left', bbox_to_anchor=(1, 1))
-    plt.grid(True, which='both', linestyle='--', linewidth=0.5)
-    plt.tight_layout()
+    ax.set_title(f"Dataset: {name}\\nBase Vector Count: {base_vector_count}\\nDimensions: {dimensions}")
+    ax.set_xlabel('Recall')
+    ax.set_ylabel('Throughput')
+    ax.legend(handles=legend_handles, loc='upper left', bbox_to_anchor=(1, 1))
+    ax.grid(True, which='both', linestyle='--', linewidth=0.5)
+    fig.tight_layout()
     
     # Save the plot to a file
     filename = f"{output_dir}/{name}_plot.png"
-    plt.savefig(filename)
+    fig.savefig(filename)
     print("saved " + filename)
-    
-    # Clear the figure for the next plot
-    plt.clf()
 
 # Load and parse data
-with open(sys.argv[1], 'r') as file:
-    content = file.read().strip().split('\n\n')
-datasets = []
-for dataset in content:
-    lines = dataset.split('\n')
-    description = lines[0]
-    data = lines[1:]
-    datasets.append((description, data))
-parsed_datasets = [parse_data(desc, data) for desc, data in datasets]
+parsed_datasets = parse_file(sys.argv[1])
 
 # Filter and plot
 for dataset in parsed_datasets: